@@ -0,0 +1,134 @@
+"""
+Startup time regression benchmark, run with `make benchmark` or `python benchmarks/startup.py`.
+
+Each benchmark runs in a fresh interpreter with this checkout first on `sys.path`, so module caching doesn't hide
+regressions and an installed copy of dnserver isn't measured by mistake.
+
+The script exits with an error if any median exceeds its limit in `MAX_MEDIAN_MS`, or, with `--baseline`,
+if it's more than `--tolerance` times slower than the median saved with `--save-baseline`.
+"""
+from __future__ import annotations as _annotations
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).parent.parent
+REPEAT = 20
+FROM_TOML_REPEAT = 5
+ZONE_COUNT = 10_000
+IMPORT_NAME = 'import dnserver'
+VERSION_NAME = "cli_logic(['--version'])"
+FROM_TOML_NAME = f'DNSServer.from_toml ({ZONE_COUNT * 2:,} zones)'
+# generous limits so they only catch real regressions, e.g. dnslib being imported eagerly again
+MAX_MEDIAN_MS = {
+    IMPORT_NAME: 40,
+    VERSION_NAME: 60,
+    FROM_TOML_NAME: 2000,
+}
+
+IMPORT_SCRIPT = """
+from time import perf_counter
+start = perf_counter()
+import dnserver
+print(perf_counter() - start)
+"""
+
+VERSION_SCRIPT = """
+from time import perf_counter
+start = perf_counter()
+from dnserver.cli import cli_logic
+try:
+    cli_logic(['--version'])
+except SystemExit:
+    pass
+print(perf_counter() - start)
+"""
+
+# dnserver is imported outside the timer so this only measures loading the file
+FROM_TOML_SCRIPT = """
+import sys
+from time import perf_counter
+from dnserver import DNSServer
+from dnserver.main import logger
+logger.disabled = True
+start = perf_counter()
+DNSServer.from_toml(sys.argv[1])
+print(perf_counter() - start)
+"""
+
+
+def run_subprocess(script: str, *args: str, repeat: int = REPEAT) -> list[float]:
+    env = dict(os.environ)
+    env['PYTHONPATH'] = os.pathsep.join(filter(None, [str(REPO_ROOT), env.get('PYTHONPATH')]))
+    times = []
+    for _ in range(repeat):
+        output = subprocess.run(
+            [sys.executable, '-c', script, *args], check=True, capture_output=True, text=True, env=env
+        ).stdout
+        times.append(float(output.strip().splitlines()[-1]))
+    return times
+
+
+def write_zones(path: Path):
+    with path.open('w') as f:
+        for i in range(ZONE_COUNT):
+            ip = f'10.0.{i // 256 % 256}.{i % 256}'
+            f.write(f"[[zones]]\nhost = 'host-{i}.example.com'\ntype = 'A'\nanswer = '{ip}'\n\n")
+            f.write(f"[[zones]]\nhost = 'host-{i}.example.com'\ntype = 'TXT'\nanswer = '''\nsome\nlong\ntext\n'''\n\n")
+
+
+def run() -> dict[str, float]:
+    """
+    Run each benchmark and return its median time in milliseconds.
+    """
+    results = {IMPORT_NAME: run_subprocess(IMPORT_SCRIPT), VERSION_NAME: run_subprocess(VERSION_SCRIPT)}
+    with tempfile.TemporaryDirectory() as tmpdir:
+        zones_file = Path(tmpdir) / 'zones.toml'
+        write_zones(zones_file)
+        results[FROM_TOML_NAME] = run_subprocess(FROM_TOML_SCRIPT, str(zones_file), repeat=FROM_TOML_REPEAT)
+
+    medians = {}
+    for name, times in results.items():
+        medians[name] = statistics.median(times) * 1000
+        print(f'{name:<40} min {min(times) * 1000:8.2f}ms  median {medians[name]:8.2f}ms')
+    return medians
+
+
+def check(medians: dict[str, float], baseline: dict[str, float] | None, tolerance: float) -> list[str]:
+    errors = []
+    for name, median in medians.items():
+        if median > MAX_MEDIAN_MS[name]:
+            errors.append(f'{name}: median {median:.2f}ms exceeds limit of {MAX_MEDIAN_MS[name]}ms')
+        if baseline and name in baseline and median > baseline[name] * tolerance:
+            errors.append(
+                f'{name}: median {median:.2f}ms is more than {tolerance}x the baseline of {baseline[name]:.2f}ms'
+            )
+    return errors
+
+
+def main(args: list[str]) -> int:
+    parser = argparse.ArgumentParser(description='dnserver startup time regression benchmark')
+    parser.add_argument('--baseline', type=Path, help='JSON file of medians to compare against')
+    parser.add_argument('--save-baseline', type=Path, help='write medians from this run to a JSON file')
+    parser.add_argument('--tolerance', type=float, default=1.5, help='allowed slowdown relative to the baseline')
+    parsed_args = parser.parse_args(args)
+
+    medians = run()
+    if parsed_args.save_baseline:
+        parsed_args.save_baseline.write_text(json.dumps(medians, indent=2))
+
+    baseline = json.loads(parsed_args.baseline.read_text()) if parsed_args.baseline else None
+    errors = check(medians, baseline, parsed_args.tolerance)
+    for error in errors:
+        print(f'regression: {error}', file=sys.stderr)
+    return 1 if errors else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
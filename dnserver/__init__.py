@@ -1,6 +1,22 @@
-from .load_records import Zone
-from .main import DNSServer
+from importlib import import_module
+from typing import TYPE_CHECKING
+
 from .version import VERSION
 
-__all__ = 'DNSServer', 'Zone', '__version__'
+if TYPE_CHECKING:
+    from .load_records import View, Zone
+    from .main import DNSServer
+
+__all__ = 'DNSServer', 'View', 'Zone', '__version__'
 __version__ = VERSION
+
+# imported lazily so `import dnserver` and the CLI don't need to import dnslib until it's used
+_LAZY_IMPORTS = {'DNSServer': 'main', 'View': 'load_records', 'Zone': 'load_records'}
+
+
+def __getattr__(name: str):
+    try:
+        module = _LAZY_IMPORTS[name]
+    except KeyError:
+        raise AttributeError(f'module {__name__!r} has no attribute {name!r}') from None
+    return getattr(import_module(f'.{module}', __name__), name)
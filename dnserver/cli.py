@@ -6,13 +6,14 @@ import signal
 import sys
 from time import sleep
 
-from .main import DEFAULT_UPSTREAM, DNSServer, logger
 from .version import VERSION
 
 __all__ = ('cli',)
 
 
 def handle_sig(signum, frame):  # pragma: no cover
+    from .main import logger
+
     logger.info('pid=%d, got signal: %s, stopping...', os.getpid(), signal.Signals(signum).name)
     raise KeyboardInterrupt
 
@@ -53,15 +54,29 @@ def cli_logic(args: list[str]) -> int:
             'consider the domain is not valid. If omitted will use DNSERVER_NO_UPSTREAM env var, or False'
         ),
     )
+    parser.add_argument(
+        '--profile',
+        action='store_true',
+        default=False,
+        help=(
+            'Record per-stage timings and cProfile stats for each request, '
+            "send SIGUSR1 to dump them, they're also dumped on exit. "
+            'If omitted will use DNSERVER_PROFILE env var, or False'
+        ),
+    )
     parser.add_argument('--version', action='version', version=f'%(prog)s v{VERSION}')
     parsed_args = parser.parse_args(args)
 
+    # imported here so `--help` and `--version` don't need to import dnslib
+    from .main import DEFAULT_UPSTREAM, DNSServer, logger
+
     port = parsed_args.port or os.getenv('DNSERVER_PORT', None)
     no_upstream = parsed_args.no_upstream or os.getenv('DNSERVER_NO_UPSTREAM', False)
     if no_upstream:
         upstream = None
     else:
         upstream = parsed_args.upstream or os.getenv('DNSERVER_UPSTREAM', DEFAULT_UPSTREAM)
+    profile = bool(parsed_args.profile or os.getenv('DNSERVER_PROFILE', False))
     zones_file = parsed_args.zones_file or os.getenv('DNSERVER_ZONE_FILE', None)
     if zones_file is None:
         print('no zones file specified, use --help for more information', file=sys.stderr)
@@ -70,7 +85,10 @@ def cli_logic(args: list[str]) -> int:
     signal.signal(signal.SIGTERM, handle_sig)
     signal.signal(signal.SIGINT, handle_sig)
 
-    server = DNSServer.from_toml(zones_file, port=port, upstream=upstream)
+    server = DNSServer.from_toml(zones_file, port=port, upstream=upstream, profile=profile)
+    if server.profiler and hasattr(signal, 'SIGUSR1'):
+        profiler = server.profiler
+        signal.signal(signal.SIGUSR1, lambda signum, frame: profiler.dump())  # pragma: no cover
     server.start()
 
     try:
@@ -81,6 +99,8 @@ def cli_logic(args: list[str]) -> int:
     finally:
         logger.info('stopping DNS server')
         server.stop()
+        if server.profiler:
+            server.profiler.dump()
 
     return 0
 
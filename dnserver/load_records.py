@@ -2,7 +2,8 @@ from __future__ import annotations as _annotations
 
 import re
 import sys
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from ipaddress import ip_network
 from pathlib import Path
 from typing import Any
 
@@ -11,7 +12,12 @@ try:
 except ImportError:
     from typing_extensions import Literal
 
-__all__ = 'load_records', 'RecordType', 'Zone'
+if sys.version_info >= (3, 11):
+    import tomllib as toml_
+else:
+    import tomli as toml_
+
+__all__ = 'load_records', 'RecordType', 'View', 'Zone'
 
 RecordType = Literal[
     'A', 'AAAA', 'CAA', 'CNAME', 'DNSKEY', 'MX', 'NAPTR', 'NS', 'PTR', 'RRSIG', 'SOA', 'SRV', 'TXT', 'SPF'
@@ -19,6 +25,9 @@ RecordType = Literal[
 RECORD_TYPES = RecordType.__args__  # type: ignore
 
 
+NEWLINE_RE = re.compile(r'\s*\r?\n')
+
+
 @dataclass
 class Zone:
     host: str
@@ -43,7 +52,8 @@ class Zone:
 
         answer = data['answer']
         if isinstance(answer, str):
-            answer = re.sub(r'\s*\r?\n', '', answer)
+            if '\n' in answer:
+                answer = NEWLINE_RE.sub('', answer)
         elif not isinstance(answer, list) or not all(isinstance(x, (str, int)) for x in answer):
             raise ValueError(
                 f'Zone {index} is invalid, "answer" must be a string or list of strings and ints, got {data!r}'
@@ -52,28 +62,73 @@ class Zone:
         return cls(host, type_, answer)
 
 
+@dataclass
+class View:
+    name: str
+    match_clients: list[str]
+    zones: list[Zone]
+    # None means use the server's upstream, False means don't proxy requests from this view
+    upstream: str | bool | None = None
+
+    @classmethod
+    def from_raw(cls, index: int, data: Any) -> View:
+        if not isinstance(data, dict) or not {'name', 'match_clients', 'zones'} <= data.keys() <= VIEW_KEYS:
+            raise ValueError(
+                f'View {index} is not a valid dict, must have keys "name", "match_clients", "zones" '
+                f'and optionally "upstream", got {data!r}'
+            )
+
+        name = data['name']
+        if not isinstance(name, str):
+            raise ValueError(f'View {index} is invalid, "name" must be string, got {data!r}')
+
+        match_clients = data['match_clients']
+        if not isinstance(match_clients, list) or not all(isinstance(x, str) for x in match_clients):
+            raise ValueError(f'View {index} is invalid, "match_clients" must be a list of strings, got {data!r}')
+        for network in match_clients:
+            try:
+                ip_network(network, strict=False)
+            except ValueError:
+                raise ValueError(f'View {index} is invalid, {network!r} is not a valid IP network')
+
+        upstream = data.get('upstream')
+        if not (upstream is None or upstream is False or isinstance(upstream, str)):
+            raise ValueError(f'View {index} is invalid, "upstream" must be a string or false, got {data!r}')
+
+        return cls(name, match_clients, load_zones(data['zones']), upstream)
+
+
+VIEW_KEYS = {'name', 'match_clients', 'zones', 'upstream'}
+
+
 @dataclass
 class Records:
     zones: list[Zone]
+    views: list[View] = field(default_factory=list)
 
 
 def load_records(zones_file: str | Path) -> Records:
     data = parse_toml(zones_file)
+    views = data.get('views', [])
+    if not isinstance(views, list):
+        raise ValueError(f'Views must be a list, not {type(views).__name__}')
+
     try:
         zones = data['zones']
     except KeyError:
-        raise ValueError(f'No zones found in {zones_file}')
+        if not views:
+            raise ValueError(f'No zones found in {zones_file}')
+        zones = []
+
+    return Records(load_zones(zones), [View.from_raw(i, view) for i, view in enumerate(views, start=1)])
 
+
+def load_zones(zones: Any) -> list[Zone]:
     if not isinstance(zones, list):
         raise ValueError(f'Zones must be a list, not {type(zones).__name__}')
-    return Records([Zone.from_raw(i, zone) for i, zone in enumerate(zones, start=1)])
+    return [Zone.from_raw(i, zone) for i, zone in enumerate(zones, start=1)]
 
 
 def parse_toml(zones_file: str | Path) -> dict[str, Any]:
-    if sys.version_info >= (3, 11):
-        import tomllib as toml_
-    else:
-        import tomli as toml_
-
     with open(zones_file, 'rb') as rf:
         return toml_.load(rf)
@@ -4,25 +4,47 @@ import logging
 from datetime import datetime
 from pathlib import Path
 from textwrap import wrap
-from typing import Any, List
+from typing import TYPE_CHECKING, Any, List
 
 from dnslib import QTYPE, RR, DNSLabel, dns
-from dnslib.proxy import ProxyResolver as LibProxyResolver
-from dnslib.server import BaseResolver as LibBaseResolver, DNSServer as LibDNSServer
 
 from .load_records import Records, Zone, load_records
+from .views import PrefixTable
+
+if TYPE_CHECKING:
+    # dnslib's server and proxy modules (and our profiling module) are only imported when they're needed
+    # to keep imports and CLI startup fast
+    from dnslib.proxy import ProxyResolver as LibProxyResolver
+    from dnslib.server import DNSServer as LibDNSServer
+
+    from .profiling import Profiler
 
 __all__ = 'DNSServer', 'logger'
 
 SERIAL_NO = int((datetime.utcnow() - datetime(1970, 1, 1)).total_seconds())
 
-handler = logging.StreamHandler()
-handler.setLevel(logging.INFO)
-handler.setFormatter(logging.Formatter('%(asctime)s: %(message)s', datefmt='%H:%M:%S'))
-
 logger = logging.getLogger(__name__)
-logger.addHandler(handler)
-logger.setLevel(logging.INFO)
+_logging_configured = False
+
+
+def setup_logging():
+    """
+    Configure `logger` the first time a server is created rather than at import time, a level or handlers
+    set up before that are left alone.
+    """
+    global _logging_configured
+    if _logging_configured:
+        return
+    _logging_configured = True
+
+    if logger.level == logging.NOTSET:
+        logger.setLevel(logging.INFO)
+    if not logger.handlers:
+        handler = logging.StreamHandler()
+        handler.setLevel(logging.INFO)
+        handler.setFormatter(logging.Formatter('%(asctime)s: %(message)s', datefmt='%H:%M:%S'))
+        logger.addHandler(handler)
+
 
 TYPE_LOOKUP = {
     'A': (dns.A, QTYPE.A),
@@ -85,11 +107,27 @@ class Record:
         return str(self.rr)
 
 
-def resolve(request, handler, records):
-    records = [Record(zone) for zone in records.zones]
+class RecordIndex:
+    """
+    Records grouped by name so a lookup only has to check records for the requested name.
+    """
+
+    def __init__(self, zones: List[Zone]):
+        self.by_name: dict[DNSLabel, list[Record]] = {}
+        self.soa: list[Record] = []
+        for zone in zones:
+            self.add(Record(zone))
+
+    def add(self, record: Record):
+        self.by_name.setdefault(record._rname, []).append(record)
+        if record._rtype == QTYPE.SOA:
+            self.soa.append(record)
+
+
+def resolve(request, handler, index: RecordIndex):
     type_name = QTYPE[request.q.qtype]
     reply = request.reply()
-    for record in records:
+    for record in index.by_name.get(request.q.qname, ()):
         if record.match(request.q):
             reply.add_answer(record.rr)
 
@@ -98,7 +136,7 @@ def resolve(request, handler, records):
         return reply
 
     # no direct zone so look for an SOA record for a higher level zone
-    for record in records:
+    for record in index.soa:
         if record.sub_match(request.q):
             reply.add_answer(record.rr)
 
@@ -107,34 +145,63 @@ def resolve(request, handler, records):
         return reply
 
 
-class BaseResolver(LibBaseResolver):
-    def __init__(self, records: Records):
-        self.records = records
-        super().__init__()
+class ResolverView:
+    def __init__(self, name: str, zones: List[Zone], upstream: str | None, proxy_cls: type[LibProxyResolver]):
+        self.name = name
+        self.index = RecordIndex(zones)
+        self.upstream = upstream
+        self.proxy = proxy_cls(address=upstream, port=53, timeout=5) if upstream else None
 
-    def resolve(self, request, handler):
-        answer = resolve(request, handler, self.records)
-        if answer:
-            return answer
 
-        type_name = QTYPE[request.q.qtype]
-        logger.info('no local zone found, not proxying %s[%s]', request.q.qname, type_name)
-        return request.reply()
+class Resolver:
+    """
+    Picks a view based on the client's address, answers from that view's records and, if nothing is found,
+    proxies to that view's upstream.
+    """
+
+    def __init__(self, records: Records, upstream: str | None, proxy_cls: type[LibProxyResolver] | None = None):
+        if proxy_cls is None:
+            from dnslib.proxy import ProxyResolver as LibProxyResolver
 
+            proxy_cls = LibProxyResolver
 
-class ProxyResolver(LibProxyResolver):
-    def __init__(self, records: Records, upstream: str):
-        self.records = records
-        super().__init__(address=upstream, port=53, timeout=5)
+        self.default_view = ResolverView('default', records.zones, upstream, proxy_cls)
+        self.has_views = bool(records.views)
+        self.views: PrefixTable[ResolverView] = PrefixTable()
+        for view in records.views:
+            view_upstream = upstream if view.upstream is None else view.upstream or None
+            resolver_view = ResolverView(view.name, view.zones, view_upstream, proxy_cls)
+            for network in view.match_clients:
+                self.views.add(network, resolver_view)
 
     def resolve(self, request, handler):
-        answer = resolve(request, handler, self.records)
+        view = self.select_view(handler)
+        reply = self.resolve_local(view, request, handler)
+        if reply is None:
+            reply = self.resolve_upstream(view, request, handler)
+        return reply
+
+    def select_view(self, handler) -> ResolverView:
+        if not self.has_views:
+            return self.default_view
+        return self.views.lookup(handler.client_address[0]) or self.default_view
+
+    def resolve_local(self, view: ResolverView, request, handler):
+        """
+        Answer the request without any network I/O, returns `None` if it needs to be proxied upstream.
+        """
+        answer = resolve(request, handler, view.index)
         if answer:
             return answer
+        elif view.proxy:
+            return None
+
+        logger.info('no local zone found, not proxying %s[%s]', request.q.qname, QTYPE[request.q.qtype])
+        return request.reply()
 
-        type_name = QTYPE[request.q.qtype]
-        logger.info('no local zone found, proxying %s[%s]', request.q.qname, type_name)
-        return super().resolve(request, handler)
+    def resolve_upstream(self, view: ResolverView, request, handler):
+        logger.info('no local zone found, proxying %s[%s]', request.q.qname, QTYPE[request.q.qtype])
+        return view.proxy.resolve(request, handler)
 
 
 class DNSServer:
@@ -143,36 +210,73 @@ class DNSServer:
         records: Records | None = None,
         port: int | str | None = DEFAULT_PORT,
         upstream: str | None = DEFAULT_UPSTREAM,
+        profile: bool = False,
     ):
         self.port: int = DEFAULT_PORT if port is None else int(port)
         self.upstream: str | None = upstream
         self.udp_server: LibDNSServer | None = None
         self.tcp_server: LibDNSServer | None = None
         self.records: Records = records if records else Records(zones=[])
+        self.resolver: Resolver | None = None
+        self.profiler: Profiler | None = None
+        if profile:
+            from . import profiling
+
+            self.profiler = profiling.Profiler()
+        setup_logging()
 
     @classmethod
     def from_toml(
-        cls, zones_file: str | Path, *, port: int | str | None = DEFAULT_PORT, upstream: str | None = DEFAULT_UPSTREAM
+        cls,
+        zones_file: str | Path,
+        *,
+        port: int | str | None = DEFAULT_PORT,
+        upstream: str | None = DEFAULT_UPSTREAM,
+        profile: bool = False,
     ) -> 'DNSServer':
         records = load_records(zones_file)
+        server = DNSServer(records, port=port, upstream=upstream, profile=profile)
         logger.info(
-            'loaded %d zone record from %s, with %s as a proxy DNS server',
+            'loaded %d zone record and %d views from %s, with %s as a proxy DNS server',
             len(records.zones),
+            len(records.views),
             zones_file,
             upstream,
         )
-        return DNSServer(records, port=port, upstream=upstream)
+        return server
 
     def start(self):
+        from dnslib.server import DNSLogger as LibDNSLogger, DNSServer as LibDNSServer
+
         if self.upstream:
             logger.info('starting DNS server on port %d, upstream DNS server "%s"', self.port, self.upstream)
-            resolver = ProxyResolver(self.records, self.upstream)
         else:
             logger.info('starting DNS server on port %d, without upstream DNS server', self.port)
-            resolver = BaseResolver(self.records)
-
-        self.udp_server = LibDNSServer(resolver, port=self.port)
-        self.tcp_server = LibDNSServer(resolver, port=self.port, tcp=True)
+        for view in self.records.views:
+            if view.upstream:
+                logger.info('view "%s" uses upstream DNS server "%s"', view.name, view.upstream)
+            elif view.upstream is False:
+                logger.info('view "%s" has no upstream DNS server', view.name)
+
+        from .udp import SingleThreadUDPServer
+
+        if self.profiler:
+            from .profiling import ProfilingDNSHandler, ProfilingProxyResolver, TimedLogger
+
+            logger.info('profiling enabled')
+            self.resolver = Resolver(self.records, self.upstream, ProfilingProxyResolver)
+            self.udp_server = LibDNSServer(
+                self.resolver, port=self.port, logger=TimedLogger(LibDNSLogger()), server=SingleThreadUDPServer
+            )
+            self.tcp_server = LibDNSServer(
+                self.resolver, port=self.port, tcp=True, logger=TimedLogger(LibDNSLogger()), handler=ProfilingDNSHandler
+            )
+            self.udp_server.server.profiler = self.profiler
+            self.tcp_server.server.profiler = self.profiler
+        else:
+            self.resolver = Resolver(self.records, self.upstream)
+            self.udp_server = LibDNSServer(self.resolver, port=self.port, server=SingleThreadUDPServer)
+            self.tcp_server = LibDNSServer(self.resolver, port=self.port, tcp=True)
         self.udp_server.start_thread()
         self.tcp_server.start_thread()
 
@@ -187,7 +291,14 @@ class DNSServer:
         return (self.udp_server and self.udp_server.isAlive()) or (self.tcp_server and self.tcp_server.isAlive())
 
     def add_record(self, zone: Zone):
+        # build the record first so an invalid zone raises an error before anything is changed
+        record = Record(zone)
+        if self.resolver:
+            self.resolver.default_view.index.add(record)
         self.records.zones.append(zone)
 
     def set_records(self, zones: List[Zone]):
+        index = RecordIndex(zones)
+        if self.resolver:
+            self.resolver.default_view.index = index
         self.records.zones = zones
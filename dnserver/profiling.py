@@ -0,0 +1,219 @@
+from __future__ import annotations as _annotations
+
+import cProfile
+import itertools
+import logging
+import os
+import pstats
+import threading
+from collections import deque
+from pathlib import Path
+from time import perf_counter
+from typing import Any, Deque, Dict
+
+from dnslib import DNSRecord
+from dnslib.proxy import ProxyResolver as LibProxyResolver
+from dnslib.server import DNSHandler as LibDNSHandler
+
+__all__ = 'Profiler', 'ProfilingDNSHandler', 'ProfilingProxyResolver', 'TimedLogger'
+
+# use the same logger as the server so output goes to the same place
+logger = logging.getLogger('dnserver.main')
+
+# stages are exclusive, "other" is whatever's left of the request's total time, mostly socket I/O
+STAGES = 'parse', 'resolve', 'upstream', 'pack', 'logging', 'other'
+DEFAULT_RING_SIZE = 10_000
+# cProfile adds a lot of overhead to each call, so only one in this many requests is run under it
+DEFAULT_CPROFILE_EVERY = 100
+
+
+class RequestTrace:
+    __slots__ = 'timings', 'started', 'cprofiled'
+
+    def __init__(self):
+        self.timings: dict[str, float] = dict.fromkeys(STAGES, 0.0)
+        self.started = perf_counter()
+        self.cprofiled = False
+
+    def add(self, stage: str, duration: float):
+        self.timings[stage] += duration
+
+
+class Profiler:
+    """
+    Collects per-stage timings for the most recent requests in a ring buffer, along with cProfile stats.
+
+    One in every `cprofile_every` requests is run under cProfile (and only one at a time), those requests are
+    left out of the ring buffer so cProfile's overhead doesn't distort the stage timings.
+    """
+
+    def __init__(self, size: int = DEFAULT_RING_SIZE, cprofile_every: int = DEFAULT_CPROFILE_EVERY):
+        self.traces: Deque[Dict[str, float]] = deque(maxlen=size)
+        self.cprofile_every = cprofile_every
+        self.cprofiled = 0
+        self._counter = itertools.count(1)
+        self._profile_lock = threading.Lock()
+        self._stats_lock = threading.Lock()
+        self._stats: pstats.Stats | None = None
+
+    def record(self, trace: RequestTrace, total: float):
+        trace.timings['other'] = max(total - sum(trace.timings.values()), 0.0)
+        trace.timings['total'] = total
+        self.traces.append(trace.timings)
+
+    def new_trace(self) -> RequestTrace:
+        return RequestTrace()
+
+    def finish(self, trace: RequestTrace):
+        """
+        Record a trace started with `RequestTrace()` unless the request was run under cProfile.
+        """
+        if not trace.cprofiled:
+            self.record(trace, perf_counter() - trace.started)
+
+    def start_cprofile(self) -> cProfile.Profile | None:
+        if next(self._counter) % self.cprofile_every or not self._profile_lock.acquire(blocking=False):
+            return None
+        profile = cProfile.Profile()
+        profile.enable()
+        return profile
+
+    def stop_cprofile(self, profile: cProfile.Profile):
+        profile.disable()
+        self._profile_lock.release()
+        with self._stats_lock:
+            self.cprofiled += 1
+            if self._stats is None:
+                self._stats = pstats.Stats(profile)
+            else:
+                self._stats.add(profile)
+
+    def stats(self, traces: list[dict[str, float]] | None = None) -> dict[str, dict[str, float]]:
+        """
+        Aggregate timings in milliseconds for each stage across the requests in the ring buffer.
+        """
+        if traces is None:
+            traces = list(self.traces)
+        stats = {}
+        for stage in STAGES + ('total',):
+            values = sorted(t[stage] * 1000 for t in traces)
+            if values:
+                stats[stage] = {
+                    'count': len(values),
+                    'mean': sum(values) / len(values),
+                    'p50': values[len(values) // 2],
+                    'p99': values[min(int(len(values) * 0.99), len(values) - 1)],
+                    'max': values[-1],
+                }
+        return stats
+
+    def dump(self, prefix: str | Path | None = None) -> None:
+        """
+        Log aggregate stats, then write cProfile stats to `<prefix>.prof` and stage timings as folded stacks,
+        which can be passed straight to flamegraph.pl, to `<prefix>.folded`.
+        """
+        prefix = prefix or f'dnserver-{os.getpid()}'
+        traces = list(self.traces)
+        stats = self.stats(traces)
+        if not stats and self._stats is None:
+            logger.info('profile: no requests recorded')
+            return
+
+        logger.info('profile: %d requests timed, %d run under cProfile', len(traces), self.cprofiled)
+        for stage, s in stats.items():
+            logger.info(
+                'profile: %-8s count=%d mean=%.3fms p50=%.3fms p99=%.3fms max=%.3fms',
+                stage,
+                s['count'],
+                s['mean'],
+                s['p50'],
+                s['p99'],
+                s['max'],
+            )
+
+        with self._stats_lock:
+            if self._stats is not None:
+                self._stats.dump_stats(f'{prefix}.prof')
+
+        with open(f'{prefix}.folded', 'w') as f:
+            for stage in STAGES:
+                f.write(f'request;{stage} {round(sum(t[stage] for t in traces) * 1_000_000)}\n')
+        logger.info('profile: written to %s.prof and %s.folded', prefix, prefix)
+
+
+class TimedLogger:
+    """
+    Wraps dnslib's logger to count time spent logging against the request.
+    """
+
+    def __init__(self, wrapped: Any):
+        self.wrapped = wrapped
+
+    def __getattr__(self, name: str) -> Any:
+        attr = getattr(self.wrapped, name)
+        if not name.startswith('log_'):
+            return attr
+
+        def log(handler, *args):
+            start = perf_counter()
+            try:
+                return attr(handler, *args)
+            finally:
+                handler.trace.add('logging', perf_counter() - start)
+
+        return log
+
+
+class ProfilingProxyResolver(LibProxyResolver):
+    def resolve(self, request, handler):
+        start = perf_counter()
+        try:
+            return super().resolve(request, handler)
+        finally:
+            handler.trace.add('upstream', perf_counter() - start)
+
+
+class ProfilingDNSHandler(LibDNSHandler):
+    """
+    Version of dnslib's handler which records how long each stage of the request takes, used for TCP requests,
+    `SingleThreadUDPServer` records the same stages for UDP requests.
+    """
+
+    def handle(self):
+        profiler: Profiler = self.server.profiler
+        self.trace = RequestTrace()
+        profile = profiler.start_cprofile()
+        start = perf_counter()
+        try:
+            super().handle()
+        finally:
+            total = perf_counter() - start
+            if profile is None:
+                profiler.record(self.trace, total)
+            else:
+                profiler.stop_cprofile(profile)
+
+    def get_reply(self, data):
+        trace = self.trace
+
+        start = perf_counter()
+        request = DNSRecord.parse(data)
+        trace.add('parse', perf_counter() - start)
+        self.server.logger.log_request(self, request)
+
+        start = perf_counter()
+        reply = self.server.resolver.resolve(request, self)
+        # upstream time is recorded separately by ProfilingProxyResolver
+        trace.add('resolve', perf_counter() - start - trace.timings['upstream'])
+        self.server.logger.log_reply(self, reply)
+
+        start = perf_counter()
+        rdata = reply.pack()
+        truncated_reply = None
+        if self.protocol == 'udp' and self.udplen and len(rdata) > self.udplen:
+            truncated_reply = reply.truncate()
+            rdata = truncated_reply.pack()
+        trace.add('pack', perf_counter() - start)
+        if truncated_reply is not None:
+            self.server.logger.log_truncated(self, truncated_reply)
+        return rdata
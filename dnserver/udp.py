@@ -0,0 +1,171 @@
+from __future__ import annotations as _annotations
+
+import selectors
+import socket
+import socketserver
+import threading
+from time import perf_counter
+from typing import TYPE_CHECKING, Any
+
+from dnslib import DNSError, DNSRecord
+
+from .main import logger
+
+if TYPE_CHECKING:
+    from .profiling import Profiler, RequestTrace
+
+__all__ = ('SingleThreadUDPServer',)
+
+# packets read before checking for shutdown again, while the socket has packets waiting
+MAX_PACKETS_PER_POLL = 32
+
+
+class UDPRequest:
+    """
+    Takes the place of dnslib's `DNSHandler` for the resolver and logger, without the socketserver machinery.
+    """
+
+    __slots__ = 'server', 'client_address', 'trace'
+    protocol = 'udp'
+
+    def __init__(self, server: SingleThreadUDPServer, client_address: Any, trace: RequestTrace | None):
+        self.server = server
+        self.client_address = client_address
+        self.trace = trace
+
+
+class SingleThreadUDPServer(socketserver.UDPServer):
+    """
+    UDP server for dnslib's `DNSServer` which answers requests from local records without starting a thread.
+
+    dnslib's own UDP server starts a thread for every packet, here packets are read with `recvfrom_into` into
+    a buffer which is reused for every packet and each reply is sent as soon as it's ready. Once the socket is
+    readable, packets are read until it would block, so a busy socket isn't polled once per packet.
+    dnslib still copies the packet when it's parsed.
+
+    Requests which have to be proxied upstream are each handled in their own thread, as with dnslib's
+    server, so a slow upstream doesn't block local answers or other upstream requests.
+
+    If `profiler` is set, each request's stage timings are recorded with it, `logger` and the resolver's
+    proxy should then be the timed versions from `dnserver.profiling`.
+    """
+
+    allow_reuse_address = True
+
+    def __init__(self, server_address, handler):
+        if server_address[0] != '' and ':' in server_address[0]:
+            self.address_family = socket.AF_INET6
+        super().__init__(server_address, handler)
+        self.socket.setblocking(False)
+        self.resolver: Any = None
+        self.logger: Any = None
+        self.profiler: Profiler | None = None
+        self._buffer = memoryview(bytearray(self.max_packet_size))
+        self._shutdown_request = False
+        self._is_shut_down = threading.Event()
+        self._is_shut_down.set()
+
+    def serve_forever(self, poll_interval: float = 0.5):
+        self._is_shut_down.clear()
+        try:
+            with selectors.DefaultSelector() as selector:
+                selector.register(self, selectors.EVENT_READ)
+                while not self._shutdown_request:
+                    if selector.select(poll_interval):
+                        self.handle_readable()
+        finally:
+            self._shutdown_request = False
+            self._is_shut_down.set()
+
+    def shutdown(self):
+        self._shutdown_request = True
+        self._is_shut_down.wait()
+
+    def handle_readable(self):
+        buffer = self._buffer
+        for _ in range(MAX_PACKETS_PER_POLL):
+            try:
+                size, address = self.socket.recvfrom_into(buffer)
+            except (BlockingIOError, InterruptedError):
+                return
+            except OSError:
+                # e.g. ICMP port unreachable from a previous reply on some platforms
+                continue
+            if self.profiler is None:
+                rdata = self.handle_packet(buffer[:size], address)
+                if rdata is not None:
+                    self.send(rdata, address)
+            else:
+                self.handle_packet_profiled(buffer[:size], address)
+
+    def handle_packet_profiled(self, data: memoryview, address: Any):
+        profiler = self.profiler
+        trace = profiler.new_trace()
+        profile = profiler.start_cprofile()
+        trace.cprofiled = profile is not None
+        try:
+            rdata = self.handle_packet(data, address, trace)
+            if rdata is not None:
+                self.send(rdata, address)
+                profiler.finish(trace)
+            # proxied requests are finished in handle_upstream
+        finally:
+            if profile is not None:
+                profiler.stop_cprofile(profile)
+
+    def handle_packet(self, data: memoryview, address: Any, trace: RequestTrace | None = None) -> bytes | None:
+        """
+        Answer a request from local records, returns `None` if there's no reply or it's been proxied upstream.
+        """
+        handler = UDPRequest(self, address, trace)
+        self.logger.log_recv(handler, data)
+        try:
+            start = perf_counter()
+            request = DNSRecord.parse(data)
+            if trace is not None:
+                trace.add('parse', perf_counter() - start)
+            self.logger.log_request(handler, request)
+
+            start = perf_counter()
+            view = self.resolver.select_view(handler)
+            reply = self.resolver.resolve_local(view, request, handler)
+            if trace is not None:
+                trace.add('resolve', perf_counter() - start)
+            if reply is None:
+                thread = threading.Thread(target=self.handle_upstream, args=(view, request, handler), daemon=True)
+                thread.start()
+                return None
+
+            return self.pack(handler, reply)
+        except DNSError as e:
+            self.logger.log_error(handler, e)
+        except Exception:
+            logger.exception('error handling request from %s', address)
+        return None
+
+    def handle_upstream(self, view: Any, request: DNSRecord, handler: UDPRequest):
+        try:
+            reply = self.resolver.resolve_upstream(view, request, handler)
+            self.send(self.pack(handler, reply), handler.client_address)
+            if handler.trace is not None:
+                self.profiler.finish(handler.trace)
+        except DNSError as e:
+            self.logger.log_error(handler, e)
+        except Exception:
+            logger.exception('error proxying request from %s', handler.client_address)
+
+    def pack(self, handler: UDPRequest, reply: DNSRecord) -> bytes:
+        self.logger.log_reply(handler, reply)
+        start = perf_counter()
+        rdata = reply.pack()
+        if handler.trace is not None:
+            handler.trace.add('pack', perf_counter() - start)
+        self.logger.log_send(handler, rdata)
+        return rdata
+
+    def send(self, rdata: bytes, address: Any):
+        try:
+            self.socket.sendto(rdata, address)
+        except OSError as e:
+            # UDP is lossy anyway, dropping a reply is better than stopping the server
+            logger.warning('error sending reply to %s: %s', address, e)
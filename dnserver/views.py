@@ -0,0 +1,67 @@
+from __future__ import annotations as _annotations
+
+from ipaddress import IPv6Address, ip_address, ip_network
+from typing import Generic, TypeVar
+
+__all__ = ('PrefixTable',)
+
+T = TypeVar('T')
+
+# each trie node is a list of [zero child, one child, value]
+_ZERO, _ONE, _VALUE = 0, 1, 2
+_MISSING = object()
+
+
+class PrefixTable(Generic[T]):
+    """
+    Longest-prefix-match table mapping IP networks to values.
+
+    Networks are stored in a binary trie keyed on address bits, so a lookup walks at most 32 (IPv4) or
+    128 (IPv6) nodes however many networks have been added.
+    """
+
+    def __init__(self):
+        self._roots = {4: self._node(), 6: self._node()}
+
+    def add(self, network: str, value: T) -> None:
+        """
+        Add a network to the table, if the network has already been added the first value is kept.
+        """
+        net = ip_network(network, strict=False)
+        bits = int(net.network_address)
+        max_len = net.max_prefixlen
+        node = self._roots[net.version]
+        for shift in range(max_len - 1, max_len - 1 - net.prefixlen, -1):
+            bit = (bits >> shift) & 1
+            child = node[bit]
+            if child is None:
+                child = node[bit] = self._node()
+            node = child
+        if node[_VALUE] is _MISSING:
+            node[_VALUE] = value
+
+    def lookup(self, address: str) -> T | None:
+        """
+        Find the value for the most specific network containing `address`, or `None` if no network matches.
+        """
+        try:
+            addr = ip_address(address.split('%', 1)[0])
+        except ValueError:
+            return None
+        if isinstance(addr, IPv6Address) and addr.ipv4_mapped:
+            addr = addr.ipv4_mapped
+
+        bits = int(addr)
+        node = self._roots[addr.version]
+        found = node[_VALUE]
+        for shift in range(addr.max_prefixlen - 1, -1, -1):
+            node = node[(bits >> shift) & 1]
+            if node is None:
+                break
+            if node[_VALUE] is not _MISSING:
+                found = node[_VALUE]
+        return None if found is _MISSING else found
+
+    @staticmethod
+    def _node() -> list:
+        return [None, None, _MISSING]
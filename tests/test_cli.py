@@ -9,6 +9,7 @@ def test_cli(mocker):
 
         def __init__(self, *args, **kwargs):
             self.run_check = 0
+            self.profiler = None
             calls.append(f'init {args} {kwargs}')
 
         @classmethod
@@ -27,11 +28,11 @@ def test_cli(mocker):
         def stop(self):
             calls.append('stop')
 
-    mocker.patch('dnserver.cli.DNSServer', new=MockDNSServer)
+    mocker.patch('dnserver.main.DNSServer', new=MockDNSServer)
     mock_signal = mocker.patch('dnserver.cli.signal.signal')
     assert cli_logic(['--port', '1234', 'zones.txt']) == 0
     assert calls == [
-        "init ('zones.txt',) {'port': '1234', 'upstream': '1.1.1.1'}",
+        "init ('zones.txt',) {'port': '1234', 'upstream': '1.1.1.1', 'profile': False}",
         'start',
         'is_running',
         'is_running',
@@ -41,7 +42,7 @@ def test_cli(mocker):
 
 
 def test_cli_no_zones(mocker):
-    mock_dnserver = mocker.patch('dnserver.cli.DNSServer')
+    mock_dnserver = mocker.patch('dnserver.main.DNSServer')
     mock_signal = mocker.patch('dnserver.cli.signal.signal')
     assert cli_logic(['--port', '1234']) == 1
     assert mock_dnserver.call_count == 0
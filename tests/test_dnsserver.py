@@ -216,3 +216,67 @@ def test_no_zone_at_initialization():
             resolve('example.com', 'A')
     finally:
         server.stop()
+
+
+def test_views(tmp_path):
+    port = 5056
+    path = tmp_path / 'zones.toml'
+    path.write_text(
+        """
+[[zones]]
+host = 'example.com'
+type = 'A'
+answer = '1.2.3.4'
+
+[[views]]
+name = 'external'
+match_clients = ['0.0.0.0/0']
+zones = []
+
+[[views]]
+name = 'local'
+match_clients = ['127.0.0.0/8']
+upstream = false
+
+[[views.zones]]
+host = 'example.com'
+type = 'A'
+answer = '127.1.2.3'
+"""
+    )
+
+    server = DNSServer.from_toml(path, port=port, upstream=None)
+    server.start()
+
+    resolver = RawResolver()
+    resolver.nameservers = ['127.0.0.1']
+    resolver.port = port
+
+    def resolve(name: str, type_: str) -> List[Dict[str, Any]]:
+        answers = resolver.resolve(name, type_)
+        return [convert_answer(answer) for answer in answers]
+
+    try:
+        assert resolve('example.com', 'A') == [
+            {
+                'type': 'A',
+                'value': '127.1.2.3',
+            },
+        ]
+        # records added dynamically go into the default view, which isn't used for this client
+        server.add_record(Zone(host='another-example.com', type='A', answer='2.3.4.5'))
+        with pytest.raises(NoAnswer):
+            resolve('another-example.com', 'A')
+    finally:
+        server.stop()
+
+
+def test_invalid_record():
+    server = DNSServer(port=5059, upstream=None)
+    server.add_record(Zone(host='example.com', type='A', answer='1.2.3.4'))
+
+    with pytest.raises(ValueError):
+        server.add_record(Zone(host='x.com', type='A', answer='not-an-ip'))
+    with pytest.raises(ValueError):
+        server.set_records([Zone(host='x.com', type='A', answer='not-an-ip')])
+    assert server.records.zones == [Zone(host='example.com', type='A', answer='1.2.3.4')]
@@ -1,6 +1,6 @@
 import pytest
 
-from dnserver.load_records import Records, Zone, load_records
+from dnserver.load_records import Records, View, Zone, load_records
 from dnserver.main import Record
 
 
@@ -65,3 +65,64 @@ def test_invalid_zones(tmp_path, toml, error):
     path.write_text(toml)
     with pytest.raises(ValueError, match=error):
         load_records(path)
+
+
+def test_load_views(tmp_path):
+    path = tmp_path / 'zones.toml'
+    path.write_text(
+        """
+[[zones]]
+host = 'example.com'
+type = 'A'
+answer = '1.2.3.4'
+
+[[views]]
+name = 'internal'
+match_clients = ['10.0.0.0/8', '127.0.0.1']
+upstream = false
+
+[[views.zones]]
+host = 'example.com'
+type = 'A'
+answer = '10.0.0.1'
+"""
+    )
+    assert load_records(path) == Records(
+        zones=[Zone(host='example.com', type='A', answer='1.2.3.4')],
+        views=[
+            View(
+                name='internal',
+                match_clients=['10.0.0.0/8', '127.0.0.1'],
+                zones=[Zone(host='example.com', type='A', answer='10.0.0.1')],
+                upstream=False,
+            )
+        ],
+    )
+
+
+def test_load_views_only(tmp_path):
+    path = tmp_path / 'zones.toml'
+    path.write_text("views = [{name='a',match_clients=['::1'],zones=[],upstream='8.8.8.8'}]")
+    assert load_records(path) == Records(
+        zones=[], views=[View(name='a', match_clients=['::1'], zones=[], upstream='8.8.8.8')]
+    )
+
+
+@pytest.mark.parametrize(
+    'toml,error',
+    [
+        ('zones = []\nviews = 4', r'^Views must be a list, not int$'),
+        ('views = [4]', 'View 1 is not a valid dict, must have keys "name", "match_clients", "zones"'),
+        ("views = [{name='a',match_clients=[],zones=[],x=1}]", 'View 1 is not a valid dict'),
+        ('views = [{name=1,match_clients=[],zones=[]}]', 'View 1 is invalid, "name" must be string'),
+        ("views = [{name='a',match_clients='x',zones=[]}]", 'View 1 is invalid, "match_clients" must be a list'),
+        ("views = [{name='a',match_clients=['x'],zones=[]}]", "View 1 is invalid, 'x' is not a valid IP network"),
+        ("views = [{name='a',match_clients=[],zones=[],upstream=true}]", 'View 1 is invalid, "upstream" must be'),
+        ("views = [{name='a',match_clients=[],zones=4}]", r'^Zones must be a list, not int$'),
+    ],
+)
+def test_invalid_views(tmp_path, toml, error):
+    path = tmp_path / 'zones.toml'
+    path.write_text(toml)
+    with pytest.raises(ValueError, match=error):
+        load_records(path)
@@ -0,0 +1,71 @@
+from dns.resolver import Resolver as RawResolver
+
+from dnserver import DNSServer
+from dnserver.profiling import STAGES, Profiler, RequestTrace
+
+
+def test_profile_server(tmp_path):
+    port = 5057
+
+    server = DNSServer.from_toml('example_zones.toml', port=port, upstream=None, profile=True)
+    server.profiler.cprofile_every = 2
+    server.start()
+
+    resolver = RawResolver()
+    resolver.nameservers = ['127.0.0.1']
+    resolver.port = port
+    try:
+        for _ in range(3):
+            resolver.resolve('example.com', 'A')
+        resolver.resolve('example.com', 'MX', tcp=True)
+    finally:
+        server.stop()
+
+    stats = server.profiler.stats()
+    assert set(stats) == set(STAGES) | {'total'}
+    # every second request is run under cProfile and left out of the timings
+    assert stats['total']['count'] == 2
+    assert server.profiler.cprofiled == 2
+    assert stats['parse']['max'] > 0
+    assert stats['upstream']['max'] == 0
+    assert stats['total']['p99'] >= stats['total']['p50']
+
+    server.profiler.dump(tmp_path / 'out')
+    assert (tmp_path / 'out.prof').exists()
+    folded = (tmp_path / 'out.folded').read_text().splitlines()
+    assert [line.split(' ')[0] for line in folded] == [f'request;{stage}' for stage in STAGES]
+
+
+def test_profiler_ring_buffer():
+    profiler = Profiler(size=2)
+    for i in range(1, 4):
+        trace = RequestTrace()
+        trace.add('parse', i)
+        profiler.record(trace, i * 2)
+    assert [t['parse'] for t in profiler.traces] == [2, 3]
+    assert [t['other'] for t in profiler.traces] == [2, 3]
+    assert profiler.stats()['total'] == {'count': 2, 'mean': 5000, 'p50': 6000, 'p99': 6000, 'max': 6000}
+
+
+def test_profiler_empty(tmp_path):
+    profiler = Profiler()
+    assert profiler.stats() == {}
+    profiler.dump(tmp_path / 'out')
+    assert not (tmp_path / 'out.prof').exists()
+
+
+def test_profile_disabled():
+    server = DNSServer(port=5058, upstream=None)
+    assert server.profiler is None
+
+
+def test_cprofile_sampling():
+    profiler = Profiler(cprofile_every=3)
+    profiles = [profiler.start_cprofile() for _ in range(3)]
+    assert profiles[:2] == [None, None]
+    assert profiles[2] is not None
+    # only one request is profiled at a time
+    for _ in range(3):
+        assert profiler.start_cprofile() is None
+    profiler.stop_cprofile(profiles[2])
+    assert profiler.cprofiled == 1
@@ -0,0 +1,75 @@
+import logging
+import subprocess
+import sys
+
+import pytest
+
+
+def imported_modules(code: str) -> set:
+    script = f'import sys\n{code}\nprint(" ".join(sys.modules))'
+    output = subprocess.run([sys.executable, '-c', script], check=True, capture_output=True, text=True).stdout
+    return set(output.split())
+
+
+@pytest.mark.parametrize(
+    'code',
+    [
+        'import dnserver',
+        'from dnserver.cli import cli_logic\ntry:\n    cli_logic(["--version"])\nexcept SystemExit:\n    pass',
+    ],
+)
+def test_lazy_imports(code):
+    modules = imported_modules(code)
+    assert 'dnserver' in modules
+    assert not modules & {'dnslib', 'dnserver.main', 'dnserver.load_records', 'dnserver.profiling'}
+
+
+def test_from_toml_imports():
+    modules = imported_modules('from dnserver import DNSServer\nDNSServer.from_toml("example_zones.toml")')
+    assert 'dnserver.main' in modules
+    assert not modules & {'dnslib.server', 'dnslib.proxy', 'dnserver.profiling', 'cProfile'}
+
+
+def test_lazy_attribute():
+    import dnserver
+
+    assert dnserver.Zone.__name__ == 'Zone'
+    with pytest.raises(AttributeError, match="module 'dnserver' has no attribute 'missing'"):
+        dnserver.missing
+
+
+@pytest.fixture
+def clean_logger(mocker):
+    from dnserver import main
+
+    mocker.patch.object(main, '_logging_configured', False)
+    handlers, level = main.logger.handlers[:], main.logger.level
+    main.logger.handlers = []
+    main.logger.setLevel(logging.NOTSET)
+    yield main.logger
+    main.logger.handlers, main.logger.level = handlers, level
+
+
+def test_setup_logging(clean_logger):
+    from dnserver.main import DNSServer
+
+    DNSServer(upstream=None)
+    assert clean_logger.level == logging.INFO
+    assert len(clean_logger.handlers) == 1
+
+    # configuration after the first server is created is kept
+    clean_logger.setLevel(logging.WARNING)
+    DNSServer(upstream=None)
+    assert clean_logger.level == logging.WARNING
+    assert len(clean_logger.handlers) == 1
+
+
+def test_setup_logging_existing_config(clean_logger):
+    from dnserver.main import setup_logging
+
+    handler = logging.NullHandler()
+    clean_logger.addHandler(handler)
+    clean_logger.setLevel(logging.ERROR)
+    setup_logging()
+    assert clean_logger.level == logging.ERROR
+    assert clean_logger.handlers == [handler]
@@ -0,0 +1,139 @@
+import socket
+import threading
+import time
+
+import pytest
+from dnslib import QTYPE, RR, A, DNSRecord
+from dnslib.server import DNSLogger, DNSServer as LibDNSServer
+
+from dnserver.load_records import Records, Zone
+from dnserver.main import Resolver
+from dnserver.profiling import STAGES, Profiler, TimedLogger
+from dnserver.udp import MAX_PACKETS_PER_POLL, SingleThreadUDPServer
+
+
+class UpstreamResolver(Resolver):
+    """Answers upstream requests without any network I/O"""
+
+    def __init__(self):
+        super().__init__(Records(zones=[Zone(host='example.com', type='A', answer='1.2.3.4')]), '192.0.2.1')
+        self.upstream_calls = []
+        # upstream calls count themselves in, then wait until released
+        self.upstream_started = threading.Semaphore(0)
+        self.upstream_release = threading.Event()
+        self.upstream_release.set()
+
+    def resolve_upstream(self, view, request, handler):
+        self.upstream_calls.append(str(request.q.qname))
+        self.upstream_started.release()
+        assert self.upstream_release.wait(timeout=5)
+        reply = request.reply()
+        reply.add_answer(RR(request.q.qname, QTYPE.A, rdata=A('5.6.7.8')))
+        return reply
+
+
+@pytest.fixture
+def udp_server():
+    server = LibDNSServer(
+        UpstreamResolver(), address='127.0.0.1', port=0, server=SingleThreadUDPServer, logger=DNSLogger('-')
+    )
+    yield server
+    server.stop()
+    server.server.server_close()
+
+
+@pytest.fixture
+def client(udp_server):
+    sock = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+    sock.settimeout(2)
+    sock.connect(udp_server.server.server_address)
+    yield sock
+    sock.close()
+
+
+def question(name: str, id_: int) -> bytes:
+    q = DNSRecord.question(name)
+    q.header.id = id_
+    return q.pack()
+
+
+def answers(data: bytes):
+    reply = DNSRecord.parse(data)
+    return reply.header.id, str(reply.q.qname), [str(rr.rdata) for rr in reply.rr]
+
+
+def test_many_waiting(udp_server, client):
+    # sent before the server starts so they're all waiting when the socket is first polled
+    count = MAX_PACKETS_PER_POLL + 5
+    for i in range(count):
+        client.send(question('example.com', i))
+    udp_server.start_thread()
+
+    replies = sorted(answers(client.recv(4096)) for _ in range(count))
+    assert replies == [(i, 'example.com.', ['1.2.3.4']) for i in range(count)]
+
+
+def test_upstream(udp_server, client):
+    udp_server.start_thread()
+    client.send(question('example.org', 1))
+    client.send(question('example.com', 2))
+
+    replies = sorted(answers(client.recv(4096)) for _ in range(2))
+    assert replies == [(1, 'example.org.', ['5.6.7.8']), (2, 'example.com.', ['1.2.3.4'])]
+    assert udp_server.server.resolver.upstream_calls == ['example.org.']
+
+
+def test_slow_upstream(udp_server, client):
+    resolver = udp_server.server.resolver
+    resolver.upstream_release.clear()
+    udp_server.start_thread()
+
+    count = 48
+    for i in range(count):
+        client.send(question(f'{i}.example.org', i))
+    client.send(question('example.com', count))
+
+    try:
+        # every upstream call is running at the same time, none of them is waiting for another to finish
+        for _ in range(count):
+            assert resolver.upstream_started.acquire(timeout=5)
+        # and the local answer isn't held up by them
+        assert answers(client.recv(4096)) == (count, 'example.com.', ['1.2.3.4'])
+    finally:
+        resolver.upstream_release.set()
+
+    replies = sorted(answers(client.recv(4096)) for _ in range(count))
+    assert replies == [(i, f'{i}.example.org.', ['5.6.7.8']) for i in range(count)]
+
+
+def test_profiler(udp_server, client):
+    profiler = Profiler(cprofile_every=3)
+    udp_server.server.profiler = profiler
+    udp_server.server.logger = TimedLogger(DNSLogger('-'))
+    udp_server.start_thread()
+
+    for i in range(3):
+        client.send(question('example.com', i))
+    client.send(question('example.org', 3))
+    replies = sorted(answers(client.recv(4096)) for _ in range(4))
+    assert [r[0] for r in replies] == [0, 1, 2, 3]
+
+    # traces are recorded after the reply is sent
+    deadline = time.monotonic() + 5
+    while len(profiler.traces) < 3 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    # the third request was run under cProfile so isn't included
+    assert len(profiler.traces) == 3
+    assert profiler.cprofiled == 1
+    for trace in profiler.traces:
+        assert set(trace) == set(STAGES) | {'total'}
+        assert trace['parse'] > 0
+        assert trace['pack'] > 0
+        assert trace['total'] >= sum(trace[stage] for stage in STAGES) - 1e-9
+
+
+def test_invalid_packet(udp_server, client):
+    udp_server.start_thread()
+    client.send(b'\x00\x01broken')
+    client.send(question('example.com', 3))
+    assert answers(client.recv(4096)) == (3, 'example.com.', ['1.2.3.4'])
@@ -0,0 +1,55 @@
+import pytest
+
+from dnserver.load_records import Records, Zone
+from dnserver.main import Resolver
+from dnserver.views import PrefixTable
+
+
+@pytest.fixture
+def table():
+    t = PrefixTable()
+    t.add('10.0.0.0/8', 'ten')
+    t.add('10.1.0.0/16', 'ten-one')
+    t.add('10.1.2.3', 'host')
+    t.add('10.1.0.0/16', 'duplicate')
+    t.add('fd00::/8', 'ula')
+    return t
+
+
+@pytest.mark.parametrize(
+    'address,value',
+    [
+        ('10.9.9.9', 'ten'),
+        ('10.1.9.9', 'ten-one'),
+        ('10.1.2.3', 'host'),
+        ('10.1.2.4', 'ten-one'),
+        ('11.0.0.1', None),
+        ('fd12::1', 'ula'),
+        ('fd12::1%eth0', 'ula'),
+        ('fe80::1', None),
+        ('::ffff:10.1.2.3', 'host'),
+        ('not-an-ip', None),
+    ],
+)
+def test_lookup(table, address, value):
+    assert table.lookup(address) == value
+
+
+def test_default_route():
+    t = PrefixTable()
+    t.add('0.0.0.0/0', 'any')
+    t.add('127.0.0.0/8', 'local')
+    assert t.lookup('127.0.0.1') == 'local'
+    assert t.lookup('8.8.8.8') == 'any'
+    assert t.lookup('::1') is None
+
+
+def test_no_views():
+    resolver = Resolver(Records(zones=[Zone(host='example.com', type='A', answer='1.2.3.4')]), None)
+
+    class Handler:
+        @property
+        def client_address(self):
+            raise AssertionError('client address should not be used without views')
+
+    assert resolver.select_view(Handler()) is resolver.default_view